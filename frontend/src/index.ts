@@ -33,6 +33,9 @@ const connectToWs = (): WebSocket => {
     return new WebSocket(url)
 }
 
+// Coordinates, sizes and angles arrive as integer hundredths
+const WIRE_SCALE = 0.01
+
 type Notification = {
     message: string
     ttl: number
@@ -102,10 +105,13 @@ class Game {
         })
         ws.addEventListener("open", () => this.beginUpdate())
         ws.addEventListener("message", async (e) => {
-            const msg: schema.ServerMessage = JSON.parse(
+            // Each tick arrives as an array of messages, errors arrive on their own
+            const data: schema.ServerMessage | schema.ServerMessage[] = JSON.parse(
                 typeof e.data === "string" ? e.data : await e.data.text(),
             )
-            this.processMessage(msg)
+            for (const msg of Array.isArray(data) ? data : [data]) {
+                this.processMessage(msg)
+            }
         })
     }
 
@@ -116,15 +122,24 @@ class Game {
     private processMessage(msg: schema.ServerMessage) {
         if (msg.type == "welcome") {
             this.myId = msg.client_id
-        } else if (msg.type === "player_position") {
-            const player = this.players.get(msg.id)
-            if (!player) {
-                console.error(`Player with ID ${msg.id} not found!`)
-                return
+        } else if (msg.type === "frame_update") {
+            for (const [id, x, y, angle] of msg.players) {
+                const player = this.players.get(id)
+                if (!player) {
+                    console.error(`Player with ID ${id} not found!`)
+                    continue
+                }
+                player.x = x * WIRE_SCALE
+                player.y = y * WIRE_SCALE
+                player.angle = angle * WIRE_SCALE
+            }
+            for (const [id, x, y, isSupercharged] of msg.bullets) {
+                this.bullets.set(id, {
+                    x: x * WIRE_SCALE,
+                    y: y * WIRE_SCALE,
+                    isSupercharged,
+                })
             }
-            player.x = msg.x
-            player.y = msg.y
-            player.angle = msg.angle
         } else if (msg.type === "player_health_changed") {
             const player = this.players.get(msg.id)
             if (!player) {
@@ -144,18 +159,27 @@ class Game {
                 this.players.set(player.id, {
                     id: player.id,
                     username: player.username,
-                    x: player.x,
-                    y: player.y,
-                    angle: player.angle,
+                    x: player.x * WIRE_SCALE,
+                    y: player.y * WIRE_SCALE,
+                    angle: player.angle * WIRE_SCALE,
                     health: player.health,
                     score: player.score,
                 })
             }
             for (const shape of msg.shapes) {
                 if (shape.kind === "box") {
-                    this.boxes.push(shape)
+                    this.boxes.push({
+                        x: shape.x * WIRE_SCALE,
+                        y: shape.y * WIRE_SCALE,
+                        width: shape.width * WIRE_SCALE,
+                        height: shape.height * WIRE_SCALE,
+                    })
                 } else {
-                    this.circles.push(shape)
+                    this.circles.push({
+                        x: shape.x * WIRE_SCALE,
+                        y: shape.y * WIRE_SCALE,
+                        radius: shape.radius * WIRE_SCALE,
+                    })
                 }
             }
         } else if (msg.type === "player_joined") {
@@ -188,12 +212,6 @@ class Game {
                 ttl: 6,
             })
             this.players.delete(msg.id)
-        } else if (msg.type === "bullet_position") {
-            this.bullets.set(msg.id, {
-                x: msg.x,
-                y: msg.y,
-                isSupercharged: msg.is_supercharged,
-            })
         } else if (msg.type === "bullet_gone") {
             this.bullets.delete(msg.id)
         } else if (msg.type === "bad_message") {
@@ -460,6 +478,10 @@ namespace schema {
         health: number
         score: number
     }
+    // [id, x, y, angle]
+    export type PlayerPosition = [number, number, number, number]
+    // [id, x, y, is_supercharged]
+    export type BulletPosition = [number, number, number, boolean]
     export type ShapeIntro =
         | { kind: "box"; x: number; y: number; width: number; height: number }
         | { kind: "circle"; x: number; y: number; radius: number }
@@ -471,11 +493,9 @@ namespace schema {
         | { type: "player_left"; id: number }
         | { type: "player_died"; id: number }
         | {
-              type: "player_position"
-              id: number
-              x: number
-              y: number
-              angle: number
+              type: "frame_update"
+              players: PlayerPosition[]
+              bullets: BulletPosition[]
           }
         | {
               type: "player_health_changed"
@@ -487,13 +507,6 @@ namespace schema {
               id: number
               new_score: number
           }
-        | {
-              type: "bullet_position"
-              id: number
-              x: number
-              y: number
-              is_supercharged: boolean
-          }
         | { type: "bullet_gone"; id: number }
         | {
               type: "world_snapshot"
@@ -1,10 +1,16 @@
+import itertools
+from collections import defaultdict
 from math import (
     ceil,
-    floor
+    floor,
+    hypot
 )
 from typing import (
+    Any,
+    Callable,
     Generic,
     Iterable,
+    Iterator,
     TypeVar
 )
 
@@ -17,85 +23,152 @@ from game.geometry import (
 
 _T = TypeVar("_T")
 
+# `(left, top, right, bottom, xstart, ystart, item)`: the bounding box of an
+# item and the first cell it was pushed into
+_Entry = tuple[float, float, float, float, int, int, _T]
+
 
 def collide_shapes(s1: Box | Circle, s2: Box | Circle) -> Vec | None:
-    if isinstance(s1, Circle):
-        if isinstance(s2, Circle):
-            return collide_circles(s1, s2)
-        else:
-            push = collide_box_circle(s2, s1)
-            if push is None:
-                return None
-            else:
-                return -push
-    else:
-        if isinstance(s2, Box):
-            return collide_boxes(s1, s2)
-        else:
-            return collide_box_circle(s1, s2)
+    return _COLLIDERS[type(s1), type(s2)](s1, s2)
 
 
 class BboxGrouper(Generic[_T]):
     def __init__(self, *, chunk_size: float) -> None:
         self._chunk_size = chunk_size
-        self._regions: dict[tuple[int, int], list[_T]] = {}
+        self._regions: defaultdict[tuple[int, int], list[_Entry[_T]]] = defaultdict(list)
+
+    def push_many(self, entries: Iterable[tuple[_T, float, float, float, float]]) -> None:
+        """
+        Push many items at once, with bounding boxes given as
+        `(item, left, top, right, bottom)`.
 
-    def push(self, item: _T, bbox: Box) -> None:
-        xstart = floor(bbox.tl.x / self._chunk_size)
-        xend = ceil(bbox.br.x / self._chunk_size)
+        This saves building a `Box` for every item just to pass it here.
+        """
+        chunk_size = self._chunk_size
+        regions = self._regions
 
-        ystart = floor(bbox.tl.y / self._chunk_size)
-        yend = ceil(bbox.br.y / self._chunk_size)
+        for item, left, top, right, bottom in entries:
+            xstart = floor(left / chunk_size)
+            xend = ceil(right / chunk_size)
 
-        for i in range(xstart, xend + 1):
-            for j in range(ystart, yend + 1):
-                self._regions.setdefault((i, j), []).append(item)
+            ystart = floor(top / chunk_size)
+            yend = ceil(bottom / chunk_size)
+
+            entry = (left, top, right, bottom, xstart, ystart, item)
+            for i in range(xstart, xend + 1):
+                for j in range(ystart, yend + 1):
+                    regions[i, j].append(entry)
 
     def regions(self) -> Iterable[list[_T]]:
-        return self._regions.values()
+        return ([entry[6] for entry in region] for region in self._regions.values())
+
+    def pairs(self) -> Iterator[tuple[_T, _T]]:
+        """
+        Every pair of items whose bounding boxes overlap, exactly once.
+
+        Two items that share cells share a whole rectangle of them, and the
+        top-left cell of that rectangle is the one where both of their
+        ranges start. The pair is only reported from that cell.
+
+        Most items that share a cell don't actually touch, and rejecting them
+        here with plain float comparisons is much cheaper than yielding them.
+        """
+        for (i, j), region in self._regions.items():
+            # Most cells only hold a single item
+            if len(region) < 2:
+                continue
+            for entry1, entry2 in itertools.combinations(region, 2):
+                left1, top1, right1, bottom1, i1, j1, item1 = entry1
+                left2, top2, right2, bottom2, i2, j2, item2 = entry2
+                if left2 > right1 or left1 > right2 or top2 > bottom1 or top1 > bottom2:
+                    continue
+                if (i1 if i1 > i2 else i2) == i and (j1 if j1 > j2 else j2) == j:
+                    yield item1, item2
 
 
 def collide_circles(c1: Circle, c2: Circle) -> Vec | None:
-    delta = c1.center - c2.center
-    target_length = c1.radius + c2.radius
-    actual_length = delta.length()
-    if actual_length > target_length:
+    push = _collide_circles_xy(
+        c1.center.x, c1.center.y, c1.radius, c2.center.x, c2.center.y, c2.radius
+    )
+    if push is None:
+        return None
+    return Vec(*push)
+
+
+def _collide_circles_xy(
+    x1: float, y1: float, r1: float, x2: float, y2: float, r2: float
+) -> tuple[float, float] | None:
+    # Works on bare floats: this runs for every candidate pair, and going
+    # through `Vec` allocated a new object for each intermediate step
+    dx = x1 - x2
+    dy = y1 - y2
+    target_length = r1 + r2
+    if dx * dx + dy * dy > target_length * target_length:
         return None
-    return delta.normal() * (target_length - actual_length) * 0.75
+    actual_length = hypot(dx, dy)
+    if actual_length == 0.0:
+        return (0.0, 0.0)
+    k = (target_length - actual_length) * 0.75 / actual_length
+    return (dx * k, dy * k)
 
 
 def collide_box_circle(box: Box, circle: Circle) -> Vec | None:
-    total = Vec(0, 0)
-
-    dy = Vec(0, circle.radius)
-    if Box(box.tl - dy, box.br + dy).contains(circle.center):
-        if circle.center.y < box.center().y:
-            delta = circle.radius - (box.tl.y - circle.center.y)
-            total += Vec(0, delta)
-        else:
-            delta = circle.radius - (circle.center.y - box.br.y)
-            total += Vec(0, -delta)
-
-    dx = Vec(circle.radius, 0)
-    if Box(box.tl - dx, box.br + dx).contains(circle.center):
-        if circle.center.x < box.center().x:
-            delta = circle.radius - (box.tl.x - circle.center.x)
-            total += Vec(delta, 0)
+    cx = circle.center.x
+    cy = circle.center.y
+    radius = circle.radius
+    left, top = box.tl.x, box.tl.y
+    right, bottom = box.br.x, box.br.y
+    tx = 0.0
+    ty = 0.0
+
+    # Circle center is inside the box stretched vertically by the radius
+    if left <= cx <= right and top - radius <= cy <= bottom + radius:
+        if cy < (top + bottom) * 0.5:
+            ty += radius - (top - cy)
         else:
-            delta = circle.radius - (circle.center.x - box.br.x)
-            total += Vec(-delta, 0)
+            ty -= radius - (cy - bottom)
 
-    point = Circle(circle.center, 0)
-    for corner in box.corners():
-        if collide_circles(point, Circle(corner, circle.radius)):
-            push = corner - circle.center
-            total += push.normal() * (circle.radius - push.length())
-
-    if total.length_squared() > 0:
-        return total * 0.75
+    # ...or stretched horizontally
+    if left - radius <= cx <= right + radius and top <= cy <= bottom:
+        if cx < (left + right) * 0.5:
+            tx += radius - (left - cx)
+        else:
+            tx -= radius - (cx - right)
+
+    radius_squared = radius * radius
+    for kx, ky in ((left, top), (right, bottom), (right, top), (left, bottom)):
+        px = kx - cx
+        py = ky - cy
+        if px * px + py * py > radius_squared:
+            continue
+        distance = hypot(px, py)
+        if distance > 0.0:
+            k = (radius - distance) / distance
+            tx += px * k
+            ty += py * k
+
+    if tx * tx + ty * ty > 0:
+        return Vec(tx * 0.75, ty * 0.75)
     else:
         return None
 
 
 def collide_boxes(_b1: Box, _b2: Box) -> Vec | None:
     return None  # Not used for now, save some damn CPU cycles
+
+
+def _collide_circle_box(circle: Circle, box: Box) -> Vec | None:
+    push = collide_box_circle(box, circle)
+    if push is None:
+        return None
+    else:
+        return -push
+
+
+# One lookup per pair instead of a chain of isinstance checks
+_COLLIDERS: dict[tuple[type, type], Callable[[Any, Any], Vec | None]] = {
+    (Circle, Circle): collide_circles,
+    (Circle, Box): _collide_circle_box,
+    (Box, Circle): collide_box_circle,
+    (Box, Box): collide_boxes,
+}
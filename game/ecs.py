@@ -13,13 +13,14 @@ from dataclasses import dataclass
 from typing import (
     Any,
     Generic,
+    NewType,
     TypeVar,
     TypeVarTuple
 )
-from weakref import WeakKeyDictionary
 
 
 _CompKey = tuple[type, ...]
+Entity = NewType("Entity", int)
 SystemFunction = Callable[..., None]
 
 
@@ -37,38 +38,88 @@ class Query(Generic[*Ts]):
     def __init__(self, world: World, key: _CompKey) -> None:
         self._world = world
         self._key = key
+        self._mask = world._mask_of(key)
+        self._version = -1
+        self._tables: list[tuple[list[Entity], list[list[object]]]] = []
 
     def __getitem__(self, entity: Entity) -> tuple[*Ts]:
-        cs = self._world._entity_to_components[entity]
-        return tuple([cs[ct] for ct in self._key])  # type: ignore
+        archetype = self._world._entity_to_archetype[entity]
+        row = archetype.rows[entity]
+        return tuple([archetype.columns[ct][row] for ct in self._key])  # type: ignore
 
     def get(self, entity: Entity) -> tuple[*Ts] | None:
-        if entity not in self._world._key_to_entities[self._key]:
+        archetype = self._world._entity_to_archetype.get(entity)
+        if archetype is None or (archetype.mask & self._mask) != self._mask:
             return None
         return self[entity]
 
     def all(self) -> Iterator[tuple[Entity, *Ts]]:
-        return self._world._query_all(self._key)  # type: ignore
+        world = self._world
+        if self._version != world._structural_version:
+            # Columns are only ever mutated in place, so the references we hold
+            # stay valid until a new archetype shows up
+            self._tables = [
+                (archetype.entities, [archetype.columns[ct] for ct in self._key])
+                for archetype in world._key_to_archetypes[self._key]
+            ]
+            self._version = world._structural_version
+
+        for entities, columns in self._tables:
+            yield from zip(entities, *columns)  # type: ignore
 
 
 class Resource(Generic[T]):
     def __init__(self, key: type[T], /) -> None:
         self._key = key
-        self._map: WeakKeyDictionary[World, T] = WeakKeyDictionary()
 
     def store(self, world: World, value: T) -> None:
-        self._map[world] = value
+        world._resources[self] = value
 
     def get(self, world: World) -> T | None:
-        return self._map.get(world)
+        return world._resources.get(self)  # type: ignore
 
     def __getitem__(self, world: World) -> T:
-        return self._map[world]
+        return world._resources[self]  # type: ignore
 
 
-@dataclass(frozen=True)
-class Entity:
-    num: int
+class _Archetype:
+    """
+    Table of all the entities that have exactly the same set of component types.
+
+    Every component type gets its own column, and all the columns are kept
+    parallel to `entities`, so a query can just zip them together.
+    """
+
+    __slots__ = ("types", "mask", "entities", "columns", "rows")
+
+    def __init__(self, types: frozenset[type], mask: int) -> None:
+        self.types = types
+        self.mask = mask
+        self.entities: list[Entity] = []
+        self.columns: dict[type, list[object]] = {ct: [] for ct in types}
+        self.rows: dict[Entity, int] = {}
+
+    def push(self, entity: Entity, components: dict[type, object]) -> None:
+        self.rows[entity] = len(self.entities)
+        self.entities.append(entity)
+        for ct, column in self.columns.items():
+            column.append(components[ct])
+
+    def pop(self, entity: Entity) -> dict[type, object]:
+        # Swap the last row into the hole so that the columns stay contiguous
+        row = self.rows.pop(entity)
+        components = {}
+        for ct, column in self.columns.items():
+            components[ct] = column[row]
+            column[row] = column[-1]
+            column.pop()
+
+        last = self.entities.pop()
+        if last != entity:
+            self.entities[row] = last
+            self.rows[last] = row
+
+        return components
 
 
 class World:
@@ -80,10 +131,18 @@ class World:
         # I made a bunch of micro-optimizations and haven't actually benchmarked them 8)
         self._systems: list[_System] = []
 
-        self._type_to_keys: dict[type, set[_CompKey]] = {}
-        self._key_to_entities: dict[_CompKey, set[Entity]] = {}
-        self._entity_to_keys: dict[Entity, set[_CompKey]] = {}
-        self._entity_to_components: dict[Entity, dict[type, object]] = {}
+        # Every component type gets a bit, so that matching a set of types
+        # against a query is a single `&` on ints
+        self._type_bits: dict[type, int] = {}
+        self._key_masks: dict[_CompKey, int] = {}
+
+        self._archetypes: dict[frozenset[type], _Archetype] = {}
+        self._key_to_archetypes: dict[_CompKey, list[_Archetype]] = {}
+        self._entity_to_archetype: dict[Entity, _Archetype] = {}
+        self._structural_version = 0
+        self._empty_archetype = self._get_archetype(frozenset())
+
+        self._resources: dict[Resource[Any], object] = {}
 
         self._on_error = on_error
         self._next_number = 0
@@ -92,7 +151,7 @@ class World:
         self._components_to_add: list[tuple[Entity, Iterable[object]]] = []
         self._components_to_delete: list[tuple[Entity, Iterable[type]]] = []
         self._entities_to_delete: list[Entity] = []
-        self._tweaks: list[tuple[Entity, type, Callable[[Any], Any]]] = []
+        self._tweaks: list[tuple[Entity, type, Callable[..., Any], tuple[Any, ...]]] = []
 
     def __setitem__(self, key: Resource[T], value: T) -> None:
         key.store(self, value)
@@ -112,37 +171,74 @@ class World:
         self.commit()
 
     def commit(self) -> None:
+        # Fold everything that happened to an entity during the tick into a
+        # single change, so it moves between archetypes at most once.
+        # Deletions go first, so a component that was both removed and added
+        # ends up present, same as applying the queues one by one.
+        killed = set(self._entities_to_delete)
+        pending: dict[Entity, tuple[set[type], dict[type, object]]] = {}
+
         for e, component_types in self._components_to_delete:
-            self.do_delete_components(e, component_types)
+            if e not in killed:
+                pending.setdefault(e, (set(), {}))[0].update(component_types)
 
         for e, components in self._components_to_add:
-            self.do_add_components(e, components)
+            if e not in killed:
+                to_add = pending.setdefault(e, (set(), {}))[1]
+                for c in components:
+                    to_add[type(c)] = c
+
+        for e, (to_delete, to_add) in pending.items():
+            self._change_components(e, to_delete, to_add)
 
-        for e in self._entities_to_delete:
+        for e in killed:
             self.do_delete_entity(e)
 
         self._components_to_add.clear()
         self._components_to_delete.clear()
         self._entities_to_delete.clear()
 
-        for e, ct, tweak in self._tweaks:
-            if cs := self._entity_to_components.get(e):
-                if ct in cs:
-                    cs[ct] = tweak(cs[ct])
+        for e, ct, tweak, args in self._tweaks:
+            if archetype := self._entity_to_archetype.get(e):
+                if (column := archetype.columns.get(ct)) is not None:
+                    row = archetype.rows[e]
+                    column[row] = tweak(column[row], *args)
         self._tweaks.clear()
 
-    def _register_query(self, key: _CompKey) -> None:
-        for ct in key:
-            self._type_to_keys.setdefault(ct, set()).add(key)
-
-        self._key_to_entities.setdefault(key, set())
-
-    def _query_all(self, key: _CompKey) -> Iterator[tuple[Any, ...]]:
-        entities = self._key_to_entities[key]
+    def _mask_of(self, types: Iterable[type]) -> int:
+        mask = 0
+        for ct in types:
+            bit = self._type_bits.get(ct)
+            if bit is None:
+                bit = self._type_bits[ct] = 1 << len(self._type_bits)
+            mask |= bit
+        return mask
 
-        for entity in entities:
-            cs = self._entity_to_components[entity]
-            yield (entity, *[cs[ct] for ct in key])
+    def _register_query(self, key: _CompKey) -> None:
+        if key not in self._key_to_archetypes:
+            mask = self._key_masks[key] = self._mask_of(key)
+            self._key_to_archetypes[key] = [
+                archetype
+                for archetype in self._archetypes.values()
+                if (archetype.mask & mask) == mask
+            ]
+
+    def _get_archetype(self, types: frozenset[type]) -> _Archetype:
+        archetype = self._archetypes.get(types)
+        if archetype is None:
+            mask = self._mask_of(types)
+            archetype = self._archetypes[types] = _Archetype(types, mask)
+            self._structural_version += 1
+            for key, archetypes in self._key_to_archetypes.items():
+                key_mask = self._key_masks[key]
+                if (mask & key_mask) == key_mask:
+                    archetypes.append(archetype)
+        return archetype
+
+    def _move(self, entity: Entity, components: dict[type, object]) -> None:
+        archetype = self._get_archetype(frozenset(components))
+        archetype.push(entity, components)
+        self._entity_to_archetype[entity] = archetype
 
     def add_systems(self, *fns: SystemFunction) -> None:
         if self._frozen:
@@ -158,8 +254,8 @@ class World:
         self._frozen = True
         self._next_number += 1
         entity = Entity(self._next_number)
-        self._entity_to_components[entity] = {}
-        self._entity_to_keys[entity] = set()
+        self._empty_archetype.push(entity, {})
+        self._entity_to_archetype[entity] = self._empty_archetype
         if components:
             self.apply(entity, components)
         return entity
@@ -171,9 +267,15 @@ class World:
         self._components_to_add.append((entity, components))
 
     def schedule_tweak(
-        self, entity: Entity, component_type: type[T], callback: Callable[[T], T]
+        self, entity: Entity, component_type: type[T], callback: Callable[..., T], /, *args: Any
     ) -> None:
-        self._tweaks.append((entity, component_type, callback))
+        """
+        On commit, replace the component with `callback(component, *args)`.
+
+        Passing the extra values as `args` lets `callback` be a plain
+        module-level function instead of a new closure for every call.
+        """
+        self._tweaks.append((entity, component_type, callback, args))
 
     def apply_many(
         self, values: Iterable[tuple[Entity, list[object] | tuple[object, ...]]], /
@@ -194,34 +296,33 @@ class World:
 
     def do_add_components(self, entity: Entity, components: Iterable[object]) -> None:
         self._frozen = True
-        cs = self._entity_to_components[entity]
-        for c in components:
-            cs[type(c)] = c
-
-        all_types = cs.keys()
-        indices = self._entity_to_keys[entity]
-        for key, es in self._key_to_entities.items():
-            if all_types >= set(key):
-                es.add(entity)
-                indices.add(key)
+        self._change_components(entity, set(), {type(c): c for c in components})
 
     def do_delete_components(self, entity: Entity, component_types: Iterable[type]) -> None:
-        cs = self._entity_to_components[entity]
-        for ct in component_types:
-            cs.pop(ct, None)
+        self._change_components(entity, set(component_types), {})
 
-        all_types = cs.keys()
-        keys = self._entity_to_keys[entity]
-        keys_to_drop = {key for key in keys if not (all_types) >= set(key)}
-        keys.difference_update(keys_to_drop)
-        for key in keys_to_drop:
-            self._key_to_entities[key].discard(entity)
+    def _change_components(
+        self, entity: Entity, to_delete: set[type], to_add: dict[type, object]
+    ) -> None:
+        archetype = self._entity_to_archetype[entity]
+        types = archetype.types
+
+        if (types - to_delete) | to_add.keys() == types:
+            # Only the values change, so the entity can stay where it is
+            row = archetype.rows[entity]
+            for ct, c in to_add.items():
+                archetype.columns[ct][row] = c
+            return
+
+        cs = archetype.pop(entity)
+        for ct in to_delete:
+            cs.pop(ct, None)
+        cs.update(to_add)
+        self._move(entity, cs)
 
     def do_delete_entity(self, entity: Entity) -> None:
-        for idx in self._entity_to_keys[entity]:
-            self._key_to_entities[idx].discard(entity)
-        self._entity_to_keys.pop(entity, None)
-        self._entity_to_components.pop(entity, None)
+        if archetype := self._entity_to_archetype.pop(entity, None):
+            archetype.pop(entity)
 
     @contextlib.contextmanager
     def catch(self) -> Iterator[None]:
@@ -2,14 +2,40 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from math import sqrt
+from math import hypot
 
 
-@dataclass(frozen=True, slots=True)
 class Vec:
+    """
+    Immutable 2D vector.
+
+    This is a hand-written slotted class rather than a frozen dataclass:
+    vectors are created on every arithmetic operation, and a frozen
+    dataclass has to go through `object.__setattr__` for each field.
+    Don't assign to `x` and `y` after construction.
+    """
+
+    __slots__ = ("x", "y")
+    __match_args__ = ("x", "y")
+
     x: float
     y: float
 
+    def __init__(self, x: float, y: float) -> None:
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not Vec:
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f"Vec(x={self.x!r}, y={self.y!r})"
+
     def dot_product(self, other: Vec) -> float:
         return self.x * other.x + self.y * other.y
 
@@ -39,33 +65,44 @@ class Vec:
         return Vec(self.x * other, self.y * other)
 
     def __truediv__(self, other: float) -> Vec:
-        return self * (1 / other)
+        return Vec(self.x / other, self.y / other)
 
     def __neg__(self) -> Vec:
         return Vec(-self.x, -self.y)
 
     def length_squared(self) -> float:
-        return self.x**2 + self.y**2
+        return self.x * self.x + self.y * self.y
 
     def length(self) -> float:
-        return sqrt(self.x**2 + self.y**2)
+        return hypot(self.x, self.y)
 
     def normal(self) -> Vec:
-        if self.x == self.y == 0:
-            return self
-        return self * (1 / sqrt(self.x**2 + self.y**2))
+        return self.length_and_normal()[1]
+
+    def length_and_normal(self) -> tuple[float, Vec]:
+        """
+        Same as `(v.length(), v.normal())`, but only computes the length once.
+        """
+        length = hypot(self.x, self.y)
+        if length == 0.0:
+            return length, self
+        return length, Vec(self.x / length, self.y / length)
 
     def __str__(self) -> str:
         return f"<{self.x:.2f}; {self.y:.2f}>"
 
 
 class Box:
-    __slots__ = ("_tl", "_br")
+    __slots__ = ("_tl", "_br", "_corners", "_center")
     __match_args__ = ("tl", "br")
 
     def __init__(self, p1: Vec, p2: Vec, /) -> None:
         self._tl = Vec(min(p1.x, p2.x), min(p1.y, p2.y))
         self._br = Vec(max(p1.x, p2.x), max(p1.y, p2.y))
+        # Computed on first access: most boxes are short-lived bounding boxes
+        # that never need these
+        self._corners: tuple[Vec, Vec, Vec, Vec] | None = None
+        self._center: Vec | None = None
 
     @property
     def tl(self) -> Vec:
@@ -80,18 +117,24 @@ class Box:
     @property
     def tr(self) -> Vec:
         """Top-right corner"""
-        return Vec(self._br.x, self._tl.y)
+        return self.corners()[2]
 
     @property
     def bl(self) -> Vec:
         """Bottom-left corner"""
-        return Vec(self._tl.x, self._br.y)
+        return self.corners()[3]
 
     def corners(self) -> tuple[Vec, Vec, Vec, Vec]:
-        return (self._tl, self._br, self.tr, self.bl)
+        if self._corners is None:
+            tl = self._tl
+            br = self._br
+            self._corners = (tl, br, Vec(br.x, tl.y), Vec(tl.x, br.y))
+        return self._corners
 
     def center(self) -> Vec:
-        return (self._tl + self._br) * 0.5
+        if self._center is None:
+            self._center = (self._tl + self._br) * 0.5
+        return self._center
 
     def size(self) -> Vec:
         return Vec(self.width(), self.height())
@@ -121,7 +164,7 @@ class Circle:
     radius: float
 
     def bbox(self) -> Box:
-        delta = Vec(self.radius / 2, self.radius / 2)
+        delta = Vec(self.radius, self.radius)
         return Box(self.center - delta, self.center + delta)
 
     def shift(self, vec: Vec) -> Circle:
@@ -1,14 +1,16 @@
+import types
+import typing
 from enum import Enum
 from typing import (
+    Any,
+    Callable,
     Literal,
     Union
 )
 
+import attr
 import orjson
-from adaptix import (
-    Retort,
-    dumper
-)
+from adaptix import Retort
 from adaptix.load_error import MsgError
 from attr import frozen
 
@@ -66,6 +68,14 @@ CLIENT_MESSAGES: dict[str, type[ClientMessage]] = {
 
 # Server messages
 
+# Coordinates, sizes and angles are sent as integer hundredths, so that
+# the payload is made of plain ints. The client multiplies them back by 0.01.
+WIRE_SCALE = 100
+
+
+def quantize(value: float) -> int:
+    return round(value * WIRE_SCALE)
+
 
 @frozen
 class ServerWelcome:
@@ -88,20 +98,25 @@ class PlayerLeft:
     id: int
 
 
-@frozen
-class PlayerPosition:
-    id: int
-    x: float
-    y: float
-    angle: float
+# Rows of `FrameUpdate`. These are sent as plain JSON arrays: there can be
+# hundreds of them per frame, and tuples go to `orjson` without any conversion.
+
+# `[id, x, y, angle]`
+PlayerPosition = tuple[int, int, int, int]
+
+# `[id, x, y, is_supercharged]`
+BulletPosition = tuple[int, int, int, bool]
 
 
 @frozen
-class BulletPosition:
-    id: int
-    x: float
-    y: float
-    is_supercharged: bool
+class FrameUpdate:
+    """
+    Positions of everything that moves, sent as one message per frame
+    instead of one message per entity.
+    """
+
+    players: list[PlayerPosition]
+    bullets: list[BulletPosition]
 
 
 @frozen
@@ -130,27 +145,27 @@ class PlayerScoreChanged:
 class PlayerIntro:
     id: int
     username: str
-    x: float
-    y: float
-    angle: float
+    x: int
+    y: int
+    angle: int
     health: int
     score: int
 
 
 @frozen
 class BoxIntro:
-    x: float
-    y: float
-    width: float
-    height: float
+    x: int
+    y: int
+    width: int
+    height: int
     kind: Literal["box"] = "box"
 
 
 @frozen
 class CircleIntro:
-    x: float
-    y: float
-    radius: float
+    x: int
+    y: int
+    radius: int
     kind: Literal["circle"] = "circle"
 
 
@@ -170,11 +185,10 @@ ServerMessage = Union[
     ServerGoodbye,
     PlayerJoined,
     PlayerLeft,
-    PlayerPosition,
+    FrameUpdate,
     PlayerHealthChanged,
     PlayerScoreChanged,
     PlayerDied,
-    BulletPosition,
     BulletGone,
     WorldSnapshot,
     BadMessage,
@@ -186,11 +200,10 @@ SERVER_MESSAGES: dict[type[ServerMessage], str] = {
     ServerGoodbye: "goodbye",
     PlayerJoined: "player_joined",
     PlayerLeft: "player_left",
-    PlayerPosition: "player_position",
+    FrameUpdate: "frame_update",
     PlayerHealthChanged: "player_health_changed",
     PlayerScoreChanged: "player_score_changed",
     PlayerDied: "player_died",
-    BulletPosition: "bullet_position",
     BulletGone: "bullet_gone",
     WorldSnapshot: "world_snapshot",
     BadMessage: "bad_message",
@@ -199,29 +212,78 @@ SERVER_MESSAGES: dict[type[ServerMessage], str] = {
 ###
 
 
-retort = Retort(
-    recipe=[
-        dumper(float, lambda f: orjson.Fragment(b"%.2f" % f)),
-    ]
-)
+retort = Retort()
+
+
+def _compile_dumper(cls: type, kind: str | None = None) -> Callable[[Any], dict[str, Any]]:
+    """
+    Generate a function that converts an instance of `cls` to a dict for `orjson`.
+
+    All the decisions about field types are made here, once, so the generated
+    function is just a single dict display with attribute reads.
+    """
+    namespace: dict[str, Any] = {}
+    items = [] if kind is None else [f'"type": {kind!r}']
+    for field in attr.fields(cls):
+        value = _dump_expr(field.type, f"m.{field.name}", namespace)
+        items.append(f"{field.name!r}: {value}")
+
+    exec(f"def dump(m):\n    return {{{', '.join(items)}}}\n", namespace)
+    return namespace["dump"]
+
+
+def _dump_expr(tp: Any, expr: str, namespace: dict[str, Any]) -> str:
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+
+    if origin is list:
+        item = _dump_expr(args[0], "v", namespace)
+        if item == "v":
+            # Nothing to convert, `orjson` can take the list as is
+            return expr
+        return f"[{item} for v in {expr}]"
+
+    if origin in (Union, types.UnionType) and all(map(attr.has, args)):
+        name = f"_dump_union_{len(namespace)}"
+        namespace[name] = {arg: _compile_dumper(arg) for arg in args}
+        return f"{name}[type({expr})]({expr})"
+
+    if attr.has(tp):
+        name = f"_dump_{tp.__name__}"
+        namespace[name] = _compile_dumper(tp)
+        return f"{name}({expr})"
+
+    return expr
+
+
+_SERVER_DUMPERS = {cls: _compile_dumper(cls, kind) for cls, kind in SERVER_MESSAGES.items()}
 
 
 def serialize_message(message: ServerMessage) -> bytes:
-    kind = SERVER_MESSAGES[type(message)]
-    return orjson.dumps(
-        {
-            "type": kind,
-            **retort.dump(message, type(message)),
-        }
-    )
+    return orjson.dumps(_SERVER_DUMPERS[type(message)](message))
+
+
+def join_messages(serialized: list[bytes]) -> bytes:
+    """
+    Combine already serialized messages into a single JSON array, so that
+    a whole tick can be sent to a client as one websocket frame.
+    """
+    return b"[" + b",".join(serialized) + b"]"
+
+
+_CLIENT_LOADERS: dict[str, Callable[[Any], ClientMessage]] = {
+    kind: retort.get_loader(cls) for kind, cls in CLIENT_MESSAGES.items()
+}
 
 
 def parse_message(raw: bytes | str) -> ClientMessage:
-    match orjson.loads(raw):
-        case {"type": str(kind), **rest}:
-            if message_class := CLIENT_MESSAGES.get(kind):
-                ok = retort.load(rest, message_class)
-                return ok
-            else:
-                raise MsgError(f"Unknown message kind {kind!r}")
+    try:
+        message = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise MsgError("Invalid JSON") from None
+    if isinstance(message, dict) and isinstance(kind := message.pop("type", None), str):
+        if loader := _CLIENT_LOADERS.get(kind):
+            return loader(message)
+        else:
+            raise MsgError(f"Unknown message kind {kind!r}")
     raise MsgError("Invalid message structure")
@@ -1,4 +1,5 @@
-import itertools
+from collections import defaultdict
+from dataclasses import dataclass
 from typing import (
     Iterable,
     NamedTuple,
@@ -29,6 +30,7 @@ from game.messages import (
     ClientId,
     ClientMessage,
     Control,
+    FrameUpdate,
     InputDown,
     InputUp,
     PlayerDied,
@@ -39,7 +41,8 @@ from game.messages import (
     Rotate,
     ServerGoodbye,
     ServerMessage,
-    WorldSnapshot
+    WorldSnapshot,
+    quantize
 )
 
 
@@ -64,12 +67,99 @@ class Inbox(Protocol):
         ...
 
 
+class CollisionTable:
+    """
+    Contacts found by `detect_collisions_system`, grouped by entity.
+
+    This is a resource rather than a component on every colliding entity:
+    contacts only live for one frame, so attaching and detaching them
+    would just move entities back and forth between archetypes.
+
+    Like component changes, new contacts only become visible on the next
+    frame: `add` writes to a pending table, and `publish` swaps it in.
+    """
+
+    def __init__(self) -> None:
+        self._contacts: defaultdict[Entity, list[tuple[Entity, Vec]]] = defaultdict(list)
+        self._pending: defaultdict[Entity, list[tuple[Entity, Vec]]] = defaultdict(list)
+
+    def publish(self) -> None:
+        # The two dicts take turns, so neither is reallocated every frame
+        self._contacts, self._pending = self._pending, self._contacts
+        self._pending.clear()
+
+    def add(self, e1: Entity, e2: Entity, push: Vec) -> None:
+        pending = self._pending
+        pending[e1].append((e2, push))
+        pending[e2].append((e1, -push))
+
+    def items(self) -> Iterable[tuple[Entity, list[tuple[Entity, Vec]]]]:
+        return self._contacts.items()
+
+
+_GrouperEntry = tuple[tuple[Entity, Box | Circle], float, float, float, float]
+_CachedCollider = tuple["Position", object, _GrouperEntry]
+
+
+class ColliderCache:
+    """
+    World-space colliders from the previous frame, with their bounds.
+
+    An entry is reused as long as the entity still has the very same
+    `Position` and collider objects. Solids never move, and idle players
+    don't get a new `Position` either, so most shapes aren't shifted again.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[Entity, _CachedCollider] = {}
+
+
+class ShapeIntroCache:
+    """
+    Snapshot intros of the static shapes.
+
+    Solids don't move, so the intros are computed once and reused for every
+    snapshot until a new solid is added.
+    """
+
+    def __init__(self) -> None:
+        self.intros: list[BoxIntro | CircleIntro] | None = None
+
+    def invalidate(self) -> None:
+        self.intros = None
+
+
+class StatDeltas:
+    """
+    Pending changes to a stat like health or score, summed per entity.
+
+    Damage is dealt by a different system than the one applying it, so the
+    changes are collected here instead of in a list on every component.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: defaultdict[Entity, int] = defaultdict(int)
+
+    def add(self, entity: Entity, delta: int) -> None:
+        self._deltas[entity] += delta
+
+    def drain(self) -> Iterable[tuple[Entity, int]]:
+        deltas = self._deltas
+        self._deltas = defaultdict(int)
+        return deltas.items()
+
+
 # Resources
 
 NET_INBOX = Resource(Inbox)
 NET_OUTBOX = Resource(Outbox)
 TIME_DELTA = Resource(float)
 FRAME = Resource(int)
+COLLISIONS = Resource(CollisionTable)
+SHAPE_INTROS = Resource(ShapeIntroCache)
+COLLIDER_CACHE = Resource(ColliderCache)
+HEALTH_DELTAS = Resource(StatDeltas)
+SCORE_DELTAS = Resource(StatDeltas)
 
 
 # Components
@@ -117,15 +207,14 @@ class Velocity(NamedTuple):
     value: Vec
 
 
-class Collisions(NamedTuple):
-    contacts: list[tuple[Entity, Vec]]
-
-
 class Solid(NamedTuple):
     pass
 
 
-class Player(NamedTuple):
+# Player and Remote are mutable, so that the fields that change every frame
+# can be updated in place instead of copying the whole component
+@dataclass(slots=True)
+class Player:
     id: int
     username: str
     weapon_cooldown: float = 0
@@ -135,12 +224,10 @@ class Player(NamedTuple):
 
 class Health(NamedTuple):
     points: int
-    modify_queue: list[int]
 
 
 class Score(NamedTuple):
     points: int
-    modify_queue: list[int]
 
 
 class HealthNotification(NamedTuple):
@@ -158,10 +245,17 @@ class Bullet(NamedTuple):
     is_supercharged: bool
 
 
-class Remote(NamedTuple):
+@dataclass(slots=True)
+class Remote:
     client_id: ClientId
     needs_snapshot: bool
-    controls: set[Control]
+    # Bitmask of the held controls, see `_control_bits`
+    controls: int
+
+
+_control_bits = {control: 1 << i for i, control in enumerate(Control)}
+_FIRE_BIT = _control_bits[Control.fire]
+_MOVEMENT_BITS = sum(_control_bits.values()) & ~_FIRE_BIT
 
 
 class DisconnectRequest(NamedTuple):
@@ -175,12 +269,13 @@ class DisconnectRequest(NamedTuple):
 
 
 def ttl_system(w: World, items: Query[TimeToLive]) -> None:
+    delta = w[TIME_DELTA]
     for entity, [ticks] in items.all():
         if ticks <= 0:
             w.unapply(entity, [TimeToLive])
             w.apply(entity, [Gone()])
         else:
-            w.apply(entity, [TimeToLive(ticks - w[TIME_DELTA])])
+            w.apply(entity, [TimeToLive(ticks - delta)])
 
 
 def remove_gone_system(w: World, corpses: Query[Gone]) -> None:
@@ -209,48 +304,57 @@ def detect_collisions_system(
 ) -> None:
     grouper = BboxGrouper[tuple[Entity, Box | Circle]](chunk_size=64.0)
 
-    for e, [pos], [box] in with_box.all():
-        box = box.shift(pos)
-        grouper.push((e, box), box)
-
-    for e, [pos], [circle] in with_circle.all():
-        circle = circle.shift(pos)
-        grouper.push((e, circle), circle.bbox())
-
-    checked: set[tuple[Entity, Entity]] = set()
-
-    collisions: dict[Entity, list[tuple[Entity, Vec]]] = {}
-
-    for region in grouper.regions():
-        for (e1, shape1), (e2, shape2) in itertools.combinations(region, 2):
-            if (e1, e2) in checked:
-                continue
-            else:
-                checked.add((e1, e2))
-            if push := collide_shapes(shape1, shape2):
-                collisions.setdefault(e1, []).append((e2, push))
-                collisions.setdefault(e2, []).append((e1, -push))
-
-    for e, entries in collisions.items():
-        w.apply(e, [Collisions(entries)])
-
-
-def remove_collisions_system(
-    w: World,
-    items: Query[Collisions],
-) -> None:
-    w.unapply_many((e, [Collisions]) for e, _ in items.all())
+    cache = w[COLLIDER_CACHE]
+    previous = cache.entries
+    current: dict[Entity, _CachedCollider] = {}
+    entries: list[_GrouperEntry] = []
+
+    for e, position, collider in with_box.all():
+        cached = previous.get(e)
+        if cached is None or cached[0] is not position or cached[1] is not collider:
+            box = collider.shape.shift(position.value)
+            tl = box.tl
+            br = box.br
+            cached = (position, collider, ((e, box), tl.x, tl.y, br.x, br.y))
+        current[e] = cached
+        entries.append(cached[2])
+
+    for e, position, collider in with_circle.all():
+        cached = previous.get(e)
+        if cached is None or cached[0] is not position or cached[1] is not collider:
+            circle = collider.shape.shift(position.value)
+            center = circle.center
+            r = circle.radius
+            entry = ((e, circle), center.x - r, center.y - r, center.x + r, center.y + r)
+            cached = (position, collider, entry)
+        current[e] = cached
+        entries.append(cached[2])
+
+    cache.entries = current
+    grouper.push_many(entries)
+
+    table = w[COLLISIONS]
+    table.publish()
+
+    for (e1, shape1), (e2, shape2) in grouper.pairs():
+        if push := collide_shapes(shape1, shape2):
+            table.add(e1, e2, push)
 
 
 def apply_player_collision_system(
     w: World,
-    collisions: Query[Player, Health, Position, Collisions],
+    targets: Query[Player, Health, Position],
     solids: Query[Solid],
     players: Query[Player],
     bullets: Query[Bullet],
     corpses: Query[Gone],
 ) -> None:
-    for e, player, health, [pos], [contacts] in collisions.all():
+    health_deltas = w[HEALTH_DELTAS]
+    for e, contacts in w[COLLISIONS].items():
+        if (target := targets.get(e)) is None:
+            continue
+        player, _, _ = target
+
         total_push = Vec(0, 0)
         for other, push in contacts:
             if corpses.get(other):
@@ -263,32 +367,31 @@ def apply_player_collision_system(
                 [bullet] = b
                 if bullet.parent != player.id:
                     damage = 5 if bullet.is_supercharged else 1
-                    health.modify_queue.append(-damage)
-                    w.schedule_tweak(
-                        e, Player, lambda p: p._replace(last_damage_source=bullet.parent)
-                    )
+                    health_deltas.add(e, -damage)
+                    w.schedule_tweak(e, Player, _set_damage_source, bullet.parent)
                     w.apply(other, [Gone()])
-        w.schedule_tweak(e, Position, lambda p, dp=total_push: Position(p.value + dp))
+        if total_push.x or total_push.y:
+            w.schedule_tweak(e, Position, _push_position, total_push)
 
 
 def apply_bullet_collision_system(
     w: World,
-    collisions: Query[Bullet, Velocity, Collisions],
+    bullets: Query[Bullet, Velocity],
     solids: Query[Solid],
 ) -> None:
-    for e, _, [velocity], [contacts] in collisions.all():
+    for e, contacts in w[COLLISIONS].items():
+        if (bullet := bullets.get(e)) is None:
+            continue
+        _, [velocity] = bullet
+
         for other, push in contacts:
             if solids.get(other):
                 if -0.75 <= velocity.alignment(push) <= 0.75:
                     # Ricochet
-                    w.schedule_tweak(
-                        e,
-                        Velocity,
-                        lambda v, push=push: Velocity(_apply_ricochet(v.value, push)),
-                    )
-                    w.schedule_tweak(e, Position, lambda p, push=push: Position(p.value + push * 3))
-                    w.schedule_tweak(e, Bullet, lambda b: b._replace(is_supercharged=True))
-                    w.schedule_tweak(e, TimeToLive, lambda ttl: TimeToLive(1.0))
+                    w.schedule_tweak(e, Velocity, _ricochet_velocity, push)
+                    w.schedule_tweak(e, Position, _push_position, push * 3)
+                    w.schedule_tweak(e, Bullet, _supercharge)
+                    w.schedule_tweak(e, TimeToLive, _reset_ricochet_ttl)
                     w.apply(e, [CircleCollider(Circle(Vec(0, 0), 6))])
                 else:
                     w.apply(e, [Gone()])
@@ -301,13 +404,43 @@ def _apply_ricochet(vel: Vec, push: Vec) -> Vec:
     return (vel + push * 90).normal() * _SJR_SPEED
 
 
+# Tweaks for `World.schedule_tweak`
+
+
+def _push_position(position: Position, push: Vec) -> Position:
+    return Position(position.value + push)
+
+
+def _set_damage_source(player: Player, source: int) -> Player:
+    player.last_damage_source = source
+    return player
+
+
+def _ricochet_velocity(velocity: Velocity, push: Vec) -> Velocity:
+    return Velocity(_apply_ricochet(velocity.value, push))
+
+
+def _supercharge(bullet: Bullet) -> Bullet:
+    return bullet._replace(is_supercharged=True)
+
+
+def _reset_ricochet_ttl(_: TimeToLive) -> TimeToLive:
+    return TimeToLive(1.0)
+
+
 def movement_system(
     w: World,
     movables: Query[Position, Velocity],
 ) -> None:
     delta = w[TIME_DELTA]
 
-    w.apply_many((e, [Position(pos + vel * delta)]) for e, [pos], [vel] in movables.all())
+    # Idle players and bullets stuck at zero speed don't need a new Position.
+    # The coordinates are added directly, so only the final `Vec` is allocated
+    w.apply_many(
+        (e, [Position(Vec(pos.x + vel.x * delta, pos.y + vel.y * delta))])
+        for e, [pos], [vel] in movables.all()
+        if vel.x or vel.y
+    )
 
 
 ## User input
@@ -323,22 +456,35 @@ _FIRE_DELAY = 0.5
 _SPEED = 270
 
 
+def _velocity_for(movement: int) -> Velocity:
+    direction = Vec(0, 0)
+    for control, bit in _control_bits.items():
+        if movement & bit:
+            direction += _directions.get(control) or Vec(0, 0)
+    return Velocity(direction.normal() * _SPEED)
+
+
+# Every combination of held movement controls maps to one shared Velocity,
+# so that the sum doesn't have to be recomputed for every player on every frame
+_velocities = [_velocity_for(movement) for movement in range(_MOVEMENT_BITS + 1)]
+
+
 def apply_inputs_system(
     w: World,
-    items: Query[Player, Orientation, Position, Remote],
+    items: Query[Player, Orientation, Position, Remote, Velocity],
 ) -> None:
-    for e, player, [angle], [pos], remote in items.all():
-        direction = Vec(0, 0)
-        for control in remote.controls:
-            direction += _directions.get(control) or Vec(0, 0)
+    delta = w[TIME_DELTA]
+    for e, player, [angle], [pos], remote, current_velocity in items.all():
+        velocity = _velocities[remote.controls & _MOVEMENT_BITS]
 
         if player.weapon_cooldown > 0:
-            w.apply(e, [player._replace(weapon_cooldown=player.weapon_cooldown - w[TIME_DELTA])])
-        elif Control.fire in remote.controls:
+            player.weapon_cooldown -= delta
+        elif remote.controls & _FIRE_BIT:
             _spawn_bullet(w, parent=player.id, pos=pos, angle=angle)
-            w.apply(e, [player._replace(weapon_cooldown=_FIRE_DELAY)])
+            player.weapon_cooldown = _FIRE_DELAY
 
-        w.apply(e, [Velocity(direction.normal() * _SPEED)])
+        if velocity is not current_velocity:
+            w.apply(e, [velocity])
 
 
 ## User stats
@@ -350,47 +496,49 @@ def apply_health_system(
     corpses: Query[Gone],
     scores: Query[Score],
 ) -> None:
-    player_id_to_entity = {player.id: e for e, player, _ in players.all()}
-
-    for e, player, health in players.all():
-        if not corpses.get(e):
-            delta = sum(health.modify_queue)
-            new_hp = health.points + delta
-            if new_hp <= 0:
-                # Dead
-                w.apply(
-                    e,
-                    [
-                        Health(0, []),
-                        Gone(),
-                    ],
-                )
-                if killer_id := player.last_damage_source:
-                    if killer_entity := player_id_to_entity.get(killer_id):
-                        if score_tuple := scores.get(killer_entity):
-                            [score] = score_tuple
-                            score.modify_queue.append(1)
-            elif health.modify_queue:
-                w.apply(
-                    e, [Health(new_hp, []), HealthNotification(change=delta, new_health=new_hp)]
-                )
+    score_deltas = w[SCORE_DELTAS]
+    # Only players who took damage this frame have a pending delta
+    for e, delta in w[HEALTH_DELTAS].drain():
+        if (target := players.get(e)) is None or corpses.get(e):
+            continue
+        player, health = target
+        new_hp = health.points + delta
+        if new_hp <= 0:
+            # Dead
+            w.apply(
+                e,
+                [
+                    Health(0),
+                    Gone(),
+                ],
+            )
+            if killer_id := player.last_damage_source:
+                # Deaths are rare, so the killer is looked up with a plain scan
+                for killer_entity, killer, _ in players.all():
+                    if killer.id == killer_id:
+                        if scores.get(killer_entity):
+                            score_deltas.add(killer_entity, 1)
+                        break
+        else:
+            w.apply(e, [Health(new_hp), HealthNotification(change=delta, new_health=new_hp)])
 
 
 def apply_score_system(
     w: World,
     scores: Query[Score],
 ) -> None:
-    for e, [points, queue] in scores.all():
-        if queue:
-            delta = sum(queue)
-            new_points = points + delta
-            w.apply(
-                e,
-                [
-                    Score(new_points, []),
-                    ScoreNotification(delta, new_points),
-                ],
-            )
+    for e, delta in w[SCORE_DELTAS].drain():
+        if (score_tuple := scores.get(e)) is None:
+            continue
+        [score] = score_tuple
+        new_points = score.points + delta
+        w.apply(
+            e,
+            [
+                Score(new_points),
+                ScoreNotification(delta, new_points),
+            ],
+        )
 
 
 ## Networking
@@ -410,57 +558,85 @@ def networking_system(
 ) -> None:
     inbox = w[NET_INBOX]
     outbox = w[NET_OUTBOX]
+    broadcast = outbox.send_broadcast
 
-    for e, [player_id, *_], [pos], [angle], [hp, *_], [score, *_] in players.all():
+    send_players = w[FRAME] % 4 == 0  # JANKY HACK
+    send_bullets = w[FRAME] % 2 == 0  # JANKY HACK
+    player_positions: list[PlayerPosition] = []
+    bullet_positions: list[BulletPosition] = []
+
+    for e, player, position, orientation, health, _ in players.all():
+        player_id = player.id
         if newborns.get(e):
-            outbox.send_broadcast(PlayerHealthChanged(player_id, hp))
+            broadcast(PlayerHealthChanged(player_id, health.points))
 
         if health_note_tuple := health_notes.get(e):
             [change] = health_note_tuple
-            outbox.send_broadcast(PlayerHealthChanged(player_id, change.new_health))
+            broadcast(PlayerHealthChanged(player_id, change.new_health))
 
         if score_note_tuple := score_notes.get(e):
             [change] = score_note_tuple
-            outbox.send_broadcast(PlayerScoreChanged(player_id, change.new_score))
+            broadcast(PlayerScoreChanged(player_id, change.new_score))
 
         if corpses.get(e):
-            outbox.send_broadcast(PlayerDied(player_id))
-        elif w[FRAME] % 4 == 0:  # JANKY HACK
-            outbox.send_broadcast(PlayerPosition(id=player_id, x=pos.x, y=pos.y, angle=angle))
+            broadcast(PlayerDied(player_id))
+        elif send_players:
+            pos = position.value
+            player_positions.append(
+                (player_id, quantize(pos.x), quantize(pos.y), quantize(orientation.radians))
+            )
 
-    for e, bullet, [pos] in bullets.all():
-        if corpses.get(e):
-            outbox.send_broadcast(BulletGone(e.num))
-        elif w[FRAME] % 2 == 0:  # JANKY HACK
-            outbox.send_broadcast(BulletPosition(e.num, pos.x, pos.y, bullet.is_supercharged))
+    if send_bullets:
+        for e, bullet, position in bullets.all():
+            if corpses.get(e):
+                broadcast(BulletGone(e))
+            else:
+                pos = position.value
+                bullet_positions.append(
+                    (e, quantize(pos.x), quantize(pos.y), bullet.is_supercharged)
+                )
+    else:
+        # Only the removed bullets matter on these frames, and there are
+        # far fewer corpses than live bullets
+        for e, _ in corpses.all():
+            if bullets.get(e):
+                broadcast(BulletGone(e))
+
+    if player_positions or bullet_positions:
+        broadcast(FrameUpdate(player_positions, bullet_positions))
 
     snapshot: ServerMessage | None = None
 
-    for e, [client_id, needs_snapshot, controls] in remotes.all():
+    for e, remote in remotes.all():
+        client_id = remote.client_id
         for msg in inbox.pop(client_id):
-            match msg:
-                case InputDown(control):
-                    controls.add(control)
-
-                case InputUp(control):
-                    controls.discard(control)
-
-                case Rotate(radians):
-                    w.apply(e, [Orientation(radians)])
-
-        if needs_snapshot:
+            # Plain type checks are cheaper than `match` with class patterns
+            msg_type = type(msg)
+            if msg_type is InputDown:
+                remote.controls |= _control_bits[msg.control]
+            elif msg_type is InputUp:
+                remote.controls &= ~_control_bits[msg.control]
+            elif msg_type is Rotate:
+                w.apply(e, [Orientation(msg.radians)])
+
+        if remote.needs_snapshot:
             if snapshot is None:
+                shape_intros = w[SHAPE_INTROS]
+                if shape_intros.intros is None:
+                    shape_intros.intros = _compute_shape_intros(
+                        circles=((pos, circle) for _, _, [pos], [circle] in circles.all()),
+                        boxes=((pos, box) for _, _, [pos], [box] in boxes.all()),
+                    )
                 snapshot = _compute_snapshot_message(
                     players=(
-                        (pos, player, angle, health, score)
-                        for _, player, [pos], angle, health, score in players.all()
+                        (position.value, player, orientation, health, score)
+                        for _, player, position, orientation, health, score in players.all()
                     ),
-                    circles=((pos, circle) for _, _, [pos], [circle] in circles.all()),
-                    boxes=((pos, box) for _, _, [pos], [box] in boxes.all()),
+                    shapes=shape_intros.intros,
                 )
 
             outbox.send_single(client_id, snapshot)
-            w.apply(e, [Remote(client_id, needs_snapshot=False, controls=controls)])
+            remote.needs_snapshot = False
 
 
 def disconnect_players_system(
@@ -477,9 +653,9 @@ def disconnect_players_system(
         return
 
     outbox = w[NET_OUTBOX]
-    for e, [client_id, *_] in players.all():
-        if client_id in to_disconnect:
-            outbox.send_single(client_id, ServerGoodbye())
+    for e, remote in players.all():
+        if remote.client_id in to_disconnect:
+            outbox.send_single(remote.client_id, ServerGoodbye())
             w.kill(e)
 
 
@@ -503,6 +679,8 @@ def add_solid_box(
     w: World,
     box: Box,
 ) -> None:
+    if shape_intros := SHAPE_INTROS.get(w):
+        shape_intros.invalidate()
     w.spawn(
         Position(box.tl),
         BoxCollider(Box(Vec(0, 0), box.size())),
@@ -515,6 +693,8 @@ def add_solid_circle(
     w: World,
     circle: Circle,
 ) -> None:
+    if shape_intros := SHAPE_INTROS.get(w):
+        shape_intros.invalidate()
     w.spawn(
         Position(circle.center),
         CircleCollider(circle.shift(-circle.center)),
@@ -534,10 +714,10 @@ def connect_new_player(
         Position(spawn_point),
         Orientation(radians=0),
         Velocity(Vec(0, 0)),
-        Remote(client_id, needs_snapshot=True, controls=set()),
+        Remote(client_id, needs_snapshot=True, controls=0),
         CircleCollider(Circle(Vec(0, 0), radius=16)),
-        Health(points=10, modify_queue=[]),
-        Score(0, []),
+        Health(points=10),
+        Score(0),
         Fresh(),
     )
 
@@ -549,21 +729,42 @@ def disconnect_player(
     w.spawn(DisconnectRequest(client_id))
 
 
-def _compute_snapshot_message(
-    players: Iterable[tuple[Vec, Player, Orientation, Health, Score]],
+def _compute_shape_intros(
     circles: Iterable[tuple[Vec, Circle]],
     boxes: Iterable[tuple[Vec, Box]],
-) -> ServerMessage:
-    circle_intros = [CircleIntro(pos.x, pos.y, circle.radius) for pos, circle in circles]
+) -> list[BoxIntro | CircleIntro]:
+    circle_intros = [
+        CircleIntro(quantize(pos.x), quantize(pos.y), quantize(circle.radius))
+        for pos, circle in circles
+    ]
     box_intros = [
-        BoxIntro((pos + box.tl).x, (pos + box.tl).y, box.width(), box.height())
+        BoxIntro(
+            quantize((pos + box.tl).x),
+            quantize((pos + box.tl).y),
+            quantize(box.width()),
+            quantize(box.height()),
+        )
         for pos, box in boxes
     ]
+    return circle_intros + box_intros
+
 
+def _compute_snapshot_message(
+    players: Iterable[tuple[Vec, Player, Orientation, Health, Score]],
+    shapes: list[BoxIntro | CircleIntro],
+) -> ServerMessage:
     return WorldSnapshot(
         players=[
-            PlayerIntro(player.id, player.username, pos.x, pos.y, angle, health, score)
-            for pos, player, [angle], [health, *_], [score, *_] in players
+            PlayerIntro(
+                player.id,
+                player.username,
+                quantize(pos.x),
+                quantize(pos.y),
+                quantize(orientation.radians),
+                health.points,
+                score.points,
+            )
+            for pos, player, orientation, health, score in players
         ],
-        shapes=circle_intros + box_intros,
+        shapes=shapes,
     )
@@ -1,24 +1,23 @@
 from __future__ import annotations
 
+import math
 import random
+import sys
 import time
+from collections import defaultdict
 from contextlib import (
     asynccontextmanager,
     contextmanager
 )
-from dataclasses import asdict
-from functools import partial
+from dataclasses import fields
 from typing import (
     Iterator,
     Mapping,
     Sequence
 )
-from weakref import WeakKeyDictionary
 
 import anyio
 from adaptix.load_error import LoadError
-from anyio.streams.memory import MemoryObjectReceiveStream as MORS
-from anyio.streams.memory import MemoryObjectSendStream as MOSS
 from attr import frozen
 from starlette.applications import Starlette
 from starlette.routing import WebSocketRoute
@@ -42,6 +41,7 @@ from game.messages import (
     PlayerLeft,
     ServerMessage,
     ServerWelcome,
+    join_messages,
     parse_message,
     serialize_message
 )
@@ -50,31 +50,35 @@ from game.messages import (
 class NetOutbox:
     def __init__(self) -> None:
         self._broadcasts: list[ServerMessage] = []
-        self._singles: dict[ClientId, list[ServerMessage]] = {}
+        # Keyed by `ClientId.value`: hashing an int is much cheaper than calling
+        # the generated `__hash__` of `ClientId`
+        self._singles: defaultdict[int, list[ServerMessage]] = defaultdict(list)
 
     def send_broadcast(self, message: ServerMessage) -> None:
         self._broadcasts.append(message)
 
     def send_single(self, client_id: ClientId, message: ServerMessage) -> None:
-        self._singles.setdefault(client_id, []).append(message)
+        self._singles[client_id.value].append(message)
 
     def bundle(self) -> MessageBundle:
-        return MessageBundle(self._broadcasts, self._singles)
-
-    def reset(self):
+        # Swap in empty containers, so that messages sent while the bundle
+        # is being pushed to the clients end up in the next one
+        bundle = MessageBundle(self._broadcasts, self._singles)
         self._broadcasts = []
-        self._singles = {}
+        self._singles = defaultdict(list)
+        return bundle
 
 
 class NetInbox:
     def __init__(self) -> None:
-        self._messages: dict[ClientId, list[ClientMessage]] = {}
+        # Keyed by `ClientId.value`, like `NetOutbox`
+        self._messages: defaultdict[int, list[ClientMessage]] = defaultdict(list)
 
     def append(self, client_id: ClientId, message: ClientMessage) -> None:
-        self._messages.setdefault(client_id, []).append(message)
+        self._messages[client_id.value].append(message)
 
     def pop(self, client_id: ClientId) -> Sequence[ClientMessage]:
-        return self._messages.pop(client_id, ())
+        return self._messages.pop(client_id.value, ())
 
 
 class PlayerQueue:
@@ -91,9 +95,17 @@ class PlayerQueue:
 
 
 class PlayerHandle:
+    # Five seconds of frames at 100 fps. A client that falls this far behind
+    # has most likely stopped reading, and gets disconnected
+    MAX_QUEUED_FRAMES = 500
+
     def __init__(self, client_id: ClientId) -> None:
         self.client_id = client_id
-        self.send, self.recv = anyio.create_memory_object_stream[list[bytes]](10)
+        # Unbounded, so that a slow client never stalls pushing the frame to
+        # everyone else. The depth is checked in `deliver_bundle` instead
+        self.send, self.recv = anyio.create_memory_object_stream[bytes](math.inf)
+        # Scope of the connection's tasks, set once they are started
+        self.cancel_scope: anyio.CancelScope | None = None
 
 
 class GameState:
@@ -104,6 +116,8 @@ class GameState:
         self._leave_queue = PlayerQueue()
         self._next_id = 0
         self._handles: dict[ClientId, PlayerHandle] = {}
+        # Rebuilt on join/leave, so the push loop doesn't copy it every tick
+        self._handles_snapshot: tuple[PlayerHandle, ...] = ()
         self._player_usernames: dict[ClientId, str] = {}
 
     def _next_client_id(self) -> ClientId:
@@ -123,7 +137,7 @@ class GameState:
         return self._leave_queue
 
     def handles(self) -> Sequence[PlayerHandle]:
-        return list(self._handles.values())
+        return self._handles_snapshot
 
     def username(self, client_id: ClientId, /) -> str:
         return self._player_usernames[client_id]
@@ -133,6 +147,7 @@ class GameState:
         client_id = self._next_client_id()
         handle = PlayerHandle(client_id)
         self._handles[client_id] = handle
+        self._handles_snapshot = tuple(self._handles.values())
         self._join_queue.add(client_id)
         self._player_usernames[client_id] = username
         print(f"Player #{client_id} ({username!r}) connected")
@@ -142,17 +157,15 @@ class GameState:
         finally:
             print(f"Player {client_id} disconnected")
             self._handles.pop(client_id)
+            self._handles_snapshot = tuple(self._handles.values())
             self._leave_queue.add(client_id)
             self._outbox.send_broadcast(PlayerLeft(id=client_id.value))
 
 
-APP_GAME_STATE = WeakKeyDictionary[Starlette, GameState]()
-
-
 async def client_ws_handler(ws: WebSocket) -> None:
     await ws.accept()
 
-    game_state = APP_GAME_STATE[ws.app]
+    game_state: GameState = ws.app.state.game_state
 
     while True:
         message = parse_message(await ws.receive_text())
@@ -160,90 +173,136 @@ async def client_ws_handler(ws: WebSocket) -> None:
             username = message.username
             break
 
-    async def _send_updates_to_player() -> None:
-        async with handle.recv:
-            async for bundle in handle.recv:
-                for msg in bundle:
-                    if ws.client_state == WebSocketState.DISCONNECTED:
-                        return
-                    await ws.send_bytes(msg)
-
-    async def _read_inputs_from_player() -> None:
-        async for json in ws.iter_text():
-            try:
-                msg = parse_message(json)
-            except LoadError as exc:
-                error_msg = BadMessage(asdict(exc))
-                print(f"Got bad message from {handle.client_id}:", error_msg)
-                await ws.send_bytes(serialize_message(error_msg))
-            else:
-                game_state.inbox().append(handle.client_id, msg)
-
     with game_state.connect_new_player(username) as handle:
         game_state.outbox().send_single(
             handle.client_id, ServerWelcome(client_id=handle.client_id.value)
         )
         async with anyio.create_task_group() as tg:
-            tg.start_soon(_send_updates_to_player)
-            tg.start_soon(_read_inputs_from_player)
+            handle.cancel_scope = tg.cancel_scope
+            tg.start_soon(_send_updates_to_player, ws, handle)
+            tg.start_soon(_read_inputs_from_player, ws, handle, game_state)
+
+
+async def _send_updates_to_player(ws: WebSocket, handle: PlayerHandle) -> None:
+    async with handle.recv:
+        async for frame in handle.recv:
+            if ws.client_state == WebSocketState.DISCONNECTED:
+                return
+            await ws.send_bytes(frame)
+
+
+async def _read_inputs_from_player(
+    ws: WebSocket, handle: PlayerHandle, game_state: GameState
+) -> None:
+    async for json in ws.iter_text():
+        try:
+            msg = parse_message(json)
+        except LoadError as exc:
+            error_msg = BadMessage(_describe_load_error(exc))
+            print(f"Got bad message from {handle.client_id}:", error_msg)
+            await ws.send_bytes(serialize_message(error_msg))
+        else:
+            game_state.inbox().append(handle.client_id, msg)
+
+
+def _describe_load_error(exc: LoadError) -> dict[str, object]:
+    # The error fields are flat, so there's no need for a deep `asdict`.
+    # Some of them hold types, though, and those can't go to JSON as is
+    return {
+        field.name: value
+        if isinstance(value := getattr(exc, field.name), (str, int, float, list))
+        else str(value)
+        for field in fields(exc)
+    }
 
 
 class Ticker:
+    """
+    Paces the game loop at a fixed rate.
+
+    Sleeping on the event loop tends to overshoot by a millisecond or more,
+    which is a lot for a 10ms frame. So the ticker wakes up early by the worst
+    overshoot seen over the last few ticks, and busy-waits for the rest.
+    """
+
+    _WINDOW = 64  # must be a power of two
+    # Other tasks don't run while the ticker spins, so it never spins for long
+    _MAX_SPIN = 0.002
+
     def __init__(self, fps: float) -> None:
         self._target_duration = 1 / fps
         self._last = time.monotonic()
+        self._overshoots = [0.0] * self._WINDOW
+        self._overshoot_index = 0
+        self._worst_overshoot = 0.0
 
     async def tick(self) -> None:
-        to_sleep = self._target_duration - (time.monotonic() - self._last)
-        await anyio.sleep(max(0, to_sleep))
-        self._last = time.monotonic()
+        now = time.monotonic()
+        # When the frame took too long, don't try to catch up
+        deadline = max(self._last + self._target_duration, now)
+        to_sleep = max(0, deadline - now - min(self._worst_overshoot, self._MAX_SPIN))
+        await anyio.sleep(to_sleep)
+        # Ticks that didn't sleep still count, so that old overshoots leave the window
+        self._record_overshoot(max(0, time.monotonic() - now - to_sleep) if to_sleep else 0.0)
+        while time.monotonic() < deadline:
+            pass
+        self._last = deadline
+
+    def _record_overshoot(self, overshoot: float) -> None:
+        index = self._overshoot_index
+        evicted = self._overshoots[index]
+        self._overshoots[index] = overshoot
+        self._overshoot_index = (index + 1) & (self._WINDOW - 1)
+        if overshoot >= self._worst_overshoot:
+            self._worst_overshoot = overshoot
+        elif evicted == self._worst_overshoot:
+            # The worst overshoot just left the window
+            self._worst_overshoot = max(self._overshoots)
+
+
+_WIDTH = 1200
+_HEIGHT = 600
+
+_TOP = Box(Vec(-10, -10), Vec(_WIDTH + 10, 0))
+_LEFT = Box(Vec(-10, -10), Vec(0, _HEIGHT + 10))
+
+# The map never changes, so it's only built once
+_BUILDINGS = (
+    # Borders
+    _LEFT,
+    _LEFT.shift(Vec(_WIDTH + 10, 0)),
+    _TOP,
+    _TOP.shift(Vec(0, _HEIGHT + 10)),
+    # Main circle
+    Circle(Vec(600, 300), 90),
+    Circle(Vec(630, 80), 20),
+    # Right whistle
+    Circle(Vec(790, 115), 50),
+    Box(Vec(790, 115), Vec(840, 325)),
+    # Right slit
+    Box(Vec(730, 370), Vec(743, 450)),
+    Box(Vec(700, 485), Vec(713, 560)),
+    Box(Vec(683, 485), Vec(730, 500)),
+    # Bottom-right long wall
+    Box(Vec(840, 485), Vec(1110, 510)),
+    # Garbage on the right
+    Circle(Vec(955, 345), 30),
+    Circle(Vec(1070, 300), 30),
+    Box(Vec(930, 200), Vec(980, 250)),
+    Circle(Vec(1000, 100), 40),
+    # Top-left long wall
+    Box(Vec(62, 76), Vec(390, 130)),
+    # Left whistle
+    Circle(Vec(320, 450), 50),
+    Box(Vec(270, 380), Vec(320, 450)),
+    Box(Vec(270, 290), Vec(320, 340)),
+    # Litte circle boi
+    Circle(Vec(155, 450), 20),
+)
 
 
 def _init_buildings(w: systems.World) -> None:
-    width = 1200
-    height = 600
-
-    shapes = []
-
-    top = Box(Vec(-10, -10), Vec(width + 10, 0))
-    left = Box(Vec(-10, -10), Vec(0, height + 10))
-    right = left.shift(Vec(width + 10, 0))
-    bottom = top.shift(Vec(0, height + 10))
-
-    shapes = [
-        # Borders
-        left,
-        right,
-        top,
-        bottom,
-        # Main circle
-        Circle(Vec(600, 300), 90),
-        Circle(Vec(630, 80), 20),
-        # Right whistle
-        Circle(Vec(790, 115), 50),
-        Box(Vec(790, 115), Vec(840, 325)),
-        # Right slit
-        Box(Vec(730, 370), Vec(743, 450)),
-        Box(Vec(700, 485), Vec(713, 560)),
-        Box(Vec(683, 485), Vec(730, 500)),
-        # Bottom-right long wall
-        Box(Vec(840, 485), Vec(1110, 510)),
-        # Garbage on the right
-        Circle(Vec(955, 345), 30),
-        Circle(Vec(1070, 300), 30),
-        Box(Vec(930, 200), Vec(980, 250)),
-        Circle(Vec(1000, 100), 40),
-        # Top-left long wall
-        Box(Vec(62, 76), Vec(390, 130)),
-        # Left whistle
-        Circle(Vec(320, 450), 50),
-        Box(Vec(270, 380), Vec(320, 450)),
-        Box(Vec(270, 290), Vec(320, 340)),
-        # Litte circle boi
-        Circle(Vec(155, 450), 20),
-    ]
-
-    for shape in shapes:
+    for shape in _BUILDINGS:
         if isinstance(shape, Circle):
             systems.add_solid_circle(w, shape)
         else:
@@ -252,117 +311,163 @@ def _init_buildings(w: systems.World) -> None:
 
 async def game_loop(
     fps: float,
-    send: MOSS[MessageBundle],
     state: GameState,
 ) -> None:
-    async with send:
-        world = systems.World()
-        world[systems.NET_INBOX] = state.inbox()
-        world[systems.NET_OUTBOX] = state.outbox()
-        world.add_systems(
-            # Generic
-            systems.ttl_system,
-            systems.remove_gone_system,
-            systems.clear_notifications_system,
-            # Movement and collisions
-            systems.movement_system,
-            systems.detect_collisions_system,
-            systems.apply_player_collision_system,
-            systems.remove_collisions_system,
-            systems.apply_bullet_collision_system,
-            # Handling input
-            systems.apply_inputs_system,
-            # Networking
-            systems.networking_system,
-            systems.disconnect_players_system,
-            # Stats (must be last)
-            systems.apply_health_system,
-            systems.apply_score_system,
-        )
-        _init_buildings(world)
-        world.commit()
+    world = systems.World()
+    world[systems.NET_INBOX] = state.inbox()
+    world[systems.NET_OUTBOX] = state.outbox()
+    world[systems.COLLISIONS] = systems.CollisionTable()
+    world[systems.SHAPE_INTROS] = systems.ShapeIntroCache()
+    world[systems.COLLIDER_CACHE] = systems.ColliderCache()
+    world[systems.HEALTH_DELTAS] = systems.StatDeltas()
+    world[systems.SCORE_DELTAS] = systems.StatDeltas()
+    world.add_systems(
+        # Generic
+        systems.ttl_system,
+        systems.remove_gone_system,
+        systems.clear_notifications_system,
+        # Movement and collisions
+        systems.movement_system,
+        systems.detect_collisions_system,
+        systems.apply_player_collision_system,
+        systems.apply_bullet_collision_system,
+        # Handling input
+        systems.apply_inputs_system,
+        # Networking
+        systems.networking_system,
+        systems.disconnect_players_system,
+        # Stats (must be last)
+        systems.apply_health_system,
+        systems.apply_score_system,
+    )
+    _init_buildings(world)
+    world.commit()
+
+    spawn_points = (
+        Vec(210, 170),
+        Vec(1080, 170),
+        Vec(524, 510),
+        Vec(500, 75),
+    )
+
+    ticker = Ticker(fps)
+
+    world[systems.FRAME] = 0
+
+    join_queue = state.join_queue()
+    leave_queue = state.leave_queue()
+    outbox = state.outbox()
+
+    last_simulation = time.monotonic()
+    while True:
+        for client_id in join_queue.pop():
+            tweak = Vec(random.random() * 10 - 5, random.random() * 10 - 5)
+            systems.connect_new_player(
+                world,
+                client_id,
+                state.username(client_id),
+                spawn_point=random.choice(spawn_points) + tweak,
+            )
 
-        spawn_points = (
-            Vec(210, 170),
-            Vec(1080, 170),
-            Vec(524, 510),
-            Vec(500, 75),
-        )
+        for client_id in leave_queue.pop():
+            systems.disconnect_player(world, client_id)
 
-        ticker = Ticker(fps)
+        # One clock read per frame: the delta covers the whole previous
+        # frame, including the time spent simulating it
+        now = time.monotonic()
+        world[systems.TIME_DELTA] = now - last_simulation
+        last_simulation = now
+        world.commit()
+        world.step()
 
-        world[systems.FRAME] = 0
+        deliver_bundle(state, outbox.bundle())
 
-        last_simulation = time.monotonic()
-        while True:
-            for client_id in state.join_queue().pop():
-                tweak = Vec(random.random() * 10 - 5, random.random() * 10 - 5)
-                systems.connect_new_player(
-                    world,
-                    client_id,
-                    state.username(client_id),
-                    spawn_point=random.choice(spawn_points) + tweak,
-                )
+        await ticker.tick()
+        world[systems.FRAME] += 1
 
-            for client_id in state.leave_queue().pop():
-                systems.disconnect_player(world, client_id)
 
-            delta = time.monotonic() - last_simulation
-            world[systems.TIME_DELTA] = delta
-            world.commit()
-            world.step()
-            last_simulation = time.monotonic()
+@frozen
+class MessageBundle:
+    broadcast: Sequence[ServerMessage]
+    # Keyed by `ClientId.value`
+    single: Mapping[int, list[ServerMessage]]
 
-            bundle = state.outbox().bundle()
-            state.outbox().reset()
-            await send.send(bundle)
 
-            await ticker.tick()
-            world[systems.FRAME] += 1
+@contextmanager
+def _fine_timer_resolution() -> Iterator[None]:
+    # Windows rounds sleeps up to ~15.6ms by default, which is more than a frame
+    if sys.platform != "win32":
+        yield
+        return
 
+    import ctypes
 
-@frozen
-class MessageBundle:
-    broadcast: Sequence[ServerMessage]
-    single: Mapping[ClientId, list[ServerMessage]]
+    winmm = ctypes.WinDLL("winmm")
+    winmm.timeBeginPeriod(1)
+    try:
+        yield
+    finally:
+        winmm.timeEndPeriod(1)
 
 
 @asynccontextmanager
 async def lifespan(app: Starlette):
-    async with anyio.create_task_group() as tg:
-        game_state = GameState()
-        APP_GAME_STATE[app] = game_state
-
-        send, recv = anyio.create_memory_object_stream[MessageBundle]()
-        tg.start_soon(
-            lambda: game_loop(
-                fps=100,
-                send=send,
-                state=game_state,
+    with _fine_timer_resolution():
+        async with anyio.create_task_group() as tg:
+            game_state = GameState()
+            app.state.game_state = game_state
+
+            tg.start_soon(
+                lambda: game_loop(
+                    fps=100,
+                    state=game_state,
+                )
             )
-        )
-        tg.start_soon(partial(push_messages_to_clients, app, recv))
-        print("Yielding...")
-        yield
-        print("Closing...")
-        tg.cancel_scope.cancel()
+            print("Yielding...")
+            yield
+            print("Closing...")
+            tg.cancel_scope.cancel()
+
+
+def deliver_bundle(game_state: GameState, bundle: MessageBundle) -> None:
+    # Nothing happens on most ticks while the server is waiting for players
+    if not (bundle.broadcast or bundle.single) or not game_state.handles():
+        return
+
+    broad_serialized = list(map(serialize_message, bundle.broadcast))
+    # Most clients only get the broadcasts, so they all share one frame
+    broad_frame = join_messages(broad_serialized)
+    # The same message object can be sent to several clients
+    # (e.g. a snapshot), so it's only serialized once per bundle
+    shared: dict[int, bytes] = {}
+    for handle in game_state.handles():
+        if local := bundle.single.get(handle.client_id.value):
+            local_serialized = [_serialize_shared(message, shared) for message in local]
+            frame = join_messages(local_serialized + broad_serialized)
+        elif broad_serialized:
+            frame = broad_frame
+        else:
+            continue
+        send = handle.send
+        if send.statistics().current_buffer_used >= handle.MAX_QUEUED_FRAMES:
+            # Drop the connection right away: the sender is most likely stuck
+            # waiting for the socket to drain, so the queued frames would never go out
+            if handle.cancel_scope is not None:
+                handle.cancel_scope.cancel()
+            continue
+        # The stream is unbounded, so this never blocks
+        try:
+            send.send_nowait(frame)
+        except anyio.BrokenResourceError:
+            # The player is disconnecting and has stopped reading
+            pass
 
 
-async def push_messages_to_clients(
-    app: Starlette,
-    recv: MORS[MessageBundle],
-) -> None:
-    game_state = APP_GAME_STATE[app]
-
-    async with recv:
-        async for bundle in recv:
-            async with anyio.create_task_group() as tg:
-                broad_serialized = list(map(serialize_message, bundle.broadcast))
-                for handle in game_state.handles():
-                    local_serialized = list(
-                        map(serialize_message, bundle.single.get(handle.client_id, ()))
-                    )
-                    tg.start_soon(partial(handle.send.send, local_serialized + broad_serialized))
+def _serialize_shared(message: ServerMessage, shared: dict[int, bytes]) -> bytes:
+    serialized = shared.get(id(message))
+    if serialized is None:
+        serialized = shared[id(message)] = serialize_message(message)
+    return serialized
 
 
 def create_app():
@@ -0,0 +1,68 @@
+import random
+
+from game.collision import BboxGrouper
+
+
+def _overlap(
+    bbox1: tuple[float, float, float, float], bbox2: tuple[float, float, float, float]
+) -> bool:
+    left1, top1, right1, bottom1 = bbox1
+    left2, top2, right2, bottom2 = bbox2
+    return left1 <= right2 and left2 <= right1 and top1 <= bottom2 and top2 <= bottom1
+
+
+def test_pairs_reports_multi_cell_items_once():
+    grouper = BboxGrouper[str](chunk_size=10.0)
+    grouper.push_many(
+        [
+            # Both span a 4x4 block of cells and share most of it
+            ("big1", 0, 0, 35, 35),
+            ("big2", 5, 5, 38, 38),
+            # Sits in a single cell in the middle of both
+            ("small", 21, 21, 24, 24),
+            # Shares cells with the big ones, but doesn't touch them
+            ("far", 36, 0, 39, 3),
+        ]
+    )
+
+    pairs = list(grouper.pairs())
+
+    assert len(pairs) == 3
+    assert {frozenset(pair) for pair in pairs} == {
+        frozenset({"big1", "big2"}),
+        frozenset({"big1", "small"}),
+        frozenset({"big2", "small"}),
+    }
+
+
+def test_pairs_touching_on_cell_border():
+    grouper = BboxGrouper[str](chunk_size=10.0)
+    grouper.push_many([("a", 0, 0, 10, 10), ("b", 10, 10, 20, 20), ("c", 20.5, 0, 30, 10)])
+
+    assert list(grouper.pairs()) == [("a", "b")]
+
+
+def test_pairs_match_brute_force():
+    rng = random.Random(0)
+
+    for _ in range(300):
+        bboxes = {}
+        for item in range(rng.randint(0, 30)):
+            left = rng.uniform(-100, 300)
+            top = rng.uniform(-100, 300)
+            width = rng.choice([rng.uniform(0, 20), rng.uniform(0, 150)])
+            height = rng.choice([rng.uniform(0, 20), rng.uniform(0, 150)])
+            bboxes[item] = (left, top, left + width, top + height)
+
+        grouper = BboxGrouper[int](chunk_size=32.0)
+        grouper.push_many((item, *bbox) for item, bbox in bboxes.items())
+        pairs = [frozenset(pair) for pair in grouper.pairs()]
+
+        expected = {
+            frozenset({item1, item2})
+            for item1 in bboxes
+            for item2 in bboxes
+            if item1 < item2 and _overlap(bboxes[item1], bboxes[item2])
+        }
+        assert len(pairs) == len(set(pairs))
+        assert set(pairs) == expected
@@ -1,3 +1,4 @@
+import functools
 from dataclasses import dataclass
 
 from game.ecs import (
@@ -203,3 +204,126 @@ def test_unapply_complex():
         ("system4", e4, True),
         ("system4", e6, True),
     }
+
+
+def test_components_survive_archetype_moves():
+    world = World()
+
+    @world.add_systems
+    def system1(w: World, query: Query[int, str]) -> None:
+        pass
+
+    [query] = world._systems[0].queries
+
+    e1 = world.spawn(10, "a")
+    e2 = world.spawn(20, "b")
+    e3 = world.spawn(30, "c")
+    world.commit()
+
+    world.unapply(e1, [str])
+    world.apply(e2, [True])
+    world.apply(e3, [31])
+    world.commit()
+
+    assert query.get(e1) is None
+    assert query[e2] == (20, "b")
+    assert query[e3] == (31, "c")
+    assert set(query.all()) == {(e2, 20, "b"), (e3, 31, "c")}
+
+    world.kill(e2)
+    world.apply(e1, ["aa"])
+    world.commit()
+
+    assert query.get(e2) is None
+    assert set(query.all()) == {(e1, 10, "aa"), (e3, 31, "c")}
+
+
+def test_query_sees_new_archetypes():
+    world = World()
+
+    @world.add_systems
+    def system1(w: World, query: Query[int]) -> None:
+        pass
+
+    [query] = world._systems[0].queries
+
+    e1 = world.spawn(10)
+    world.commit()
+    assert set(query.all()) == {(e1, 10)}
+
+    e2 = world.spawn(20, "b")
+    world.commit()
+    assert set(query.all()) == {(e1, 10), (e2, 20)}
+
+
+def test_commit_folds_changes_per_entity():
+    world = World()
+
+    @world.add_systems
+    def system1(w: World, query: Query[int]) -> None:
+        pass
+
+    [query] = world._systems[0].queries
+
+    e1 = world.spawn(10, "a")
+    e2 = world.spawn(20)
+    e3 = world.spawn(30)
+    world.commit()
+
+    world.unapply(e1, [int, str])
+    world.apply(e1, [11])
+    world.apply(e2, [21])
+    world.apply(e2, [22, "b"])
+    world.apply(e3, [31])
+    world.kill(e3)
+    world.commit()
+
+    assert set(query.all()) == {(e1, 11), (e2, 22)}
+    assert world._entity_to_archetype[e1].types == {int}
+    assert world._entity_to_archetype[e2].types == {int, str}
+
+
+def test_schedule_tweak_passes_args():
+    world = World()
+
+    @world.add_systems
+    def system1(w: World, query: Query[int]) -> None:
+        pass
+
+    [query] = world._systems[0].queries
+
+    e1 = world.spawn(10)
+    e2 = world.spawn(20)
+    world.commit()
+
+    world.schedule_tweak(e1, int, lambda x: x + 1)
+    world.schedule_tweak(e2, int, pow, 2)
+    world.schedule_tweak(e2, int, lambda x, a, b: x + a + b, 3, 4)
+    world.commit()
+
+    assert set(query.all()) == {(e1, 11), (e2, 407)}
+
+
+def test_decorated_system():
+    world = World()
+    calls = []
+
+    def logged(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            calls.append(fn.__name__)
+            return fn(*args)
+
+        return wrapper
+
+    @world.add_systems
+    @logged
+    def system1(w: World, query: Query[int]) -> None:
+        pass
+
+    world.spawn(10)
+    world.commit()
+    world.step()
+
+    assert calls == ["system1"]
+    assert world._systems[0].queries[0]._key == (int,)
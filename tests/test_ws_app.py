@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+import anyio
+from starlette.websockets import WebSocketState
+
+import game.ws_app as ws_app
+from game.messages import PlayerLeft
+from game.ws_app import (
+    GameState,
+    MessageBundle,
+    PlayerHandle,
+    Ticker,
+    client_ws_handler,
+    deliver_bundle
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.oversleep = 0.0
+        self.woke_up = 0.0
+
+    def monotonic(self) -> float:
+        # Every read takes a bit of time, so that busy-waiting terminates
+        self.now += 0.000001
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds + self.oversleep
+        self.woke_up = self.now
+
+
+def test_ticker_forgets_old_overshoots(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ws_app.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ws_app.anyio, "sleep", clock.sleep)
+
+    ticker = Ticker(100)
+    spins = []
+    for frame in range(300):
+        clock.now += 0.002  # simulating the frame
+        clock.oversleep = 0.012 if frame == 50 else 0.0
+
+        # The fake sleep never suspends, so the tick completes in one step
+        try:
+            ticker.tick().send(None)
+        except StopIteration:
+            pass
+        else:
+            raise AssertionError("tick didn't complete")
+
+        spins.append(clock.now - clock.woke_up)
+
+    # The hiccup is only remembered for one window
+    assert max(spins[50 + Ticker._WINDOW + 1 :]) < 0.0001
+    # ...and even then, the ticker never spins for most of a frame
+    assert max(spins) < 0.003
+
+
+class StuckWebSocket:
+    """A client that says hello, then stops reading and never sends anything again."""
+
+    def __init__(self, state: GameState) -> None:
+        self.app = SimpleNamespace(state=SimpleNamespace(game_state=state))
+        self.client_state = WebSocketState.CONNECTED
+        self.sent = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive_text(self) -> str:
+        return '{"type": "hello", "username": "slow"}'
+
+    async def iter_text(self) -> AsyncIterator[str]:
+        await anyio.sleep_forever()
+        yield ""
+
+    async def send_bytes(self, _: bytes) -> None:
+        self.sent += 1
+        # The socket doesn't drain
+        await anyio.sleep_forever()
+
+
+def test_deliver_bundle_cuts_off_clients_that_stop_reading():
+    state = GameState()
+    bundle = MessageBundle(broadcast=[PlayerLeft(id=42)], single={})
+    ws = StuckWebSocket(state)
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client_ws_handler, ws)
+            await anyio.wait_all_tasks_blocked()
+            [handle] = state.handles()
+            assert state.join_queue().pop() == [handle.client_id]
+
+            with state.connect_new_player("fast") as fast:
+                # The first frame is taken by the stuck sender, the rest pile up
+                for _ in range(PlayerHandle.MAX_QUEUED_FRAMES + 2):
+                    deliver_bundle(state, bundle)
+                    fast.recv.receive_nowait()
+                await anyio.wait_all_tasks_blocked()
+
+                # The stuck player is gone, without waiting for the socket
+                assert state.handles() == (fast,)
+                assert state.leave_queue().pop() == [handle.client_id]
+                assert ws.sent == 1
+
+                deliver_bundle(state, bundle)
+                assert fast.recv.receive_nowait()
+
+    anyio.run(main)